@@ -8,17 +8,39 @@ represent placed on a folder with the package name, on the 'packages' folder"""
 
 import sys
 import os
+from collections import deque
 from itertools import product
 from random import randrange, choice
+from time import perf_counter
 
 import pygame
 from pygame.locals import *
 
 from tools import setup, load_package, save_profile, load_profile, tile_gen
+from rules import slide, game_won, game_over
 
-def main(profile="default"):
-    """Main function that is run to start application"""
-    global SCORE, PROFILE
+# arrow keys and the direction they move the board in
+MOVE_KEYS = {K_UP: "UP", K_DOWN: "DOWN", K_LEFT: "LEFT", K_RIGHT: "RIGHT"}
+
+# how many moves can wait to be applied before new ones are dropped
+MAX_QUEUED_MOVES = 16
+
+# (delay, interval) in milliseconds used when the profile turns on key repeat
+KEY_REPEAT = (200, 60)
+
+# events that end the wait for the next frame early
+WAKE_EVENTS = (QUIT, KEYDOWN, MOUSEBUTTONUP)
+
+# time in seconds between a key press and showing its result, for the latest moves of the current game
+LATENCY = deque(maxlen=600)
+
+def main(profile="default", report_latency=False):
+    """Main function that is run to start application.
+    If report_latency is True, the input latency is printed when the game closes"""
+    global SCORE, PROFILE, REPORT_LATENCY
+
+    REPORT_LATENCY = report_latency
+    LATENCY.clear() # forget moves from games played before going back to the menu
 
     # run setup, check if everything is alright
     setup()
@@ -36,6 +58,9 @@ def main(profile="default"):
     screen = pygame.display.set_mode((600, 600))
     pygame.display.set_caption("x800 - a 2048 clone")
 
+    # holding down an arrow key keeps moving the board, if the profile allows it
+    if PROFILE["key_repeat"]: pygame.key.set_repeat(*KEY_REPEAT)
+
     # back button surface
     back_button = pygame.font.SysFont("monospace", 25).render(" <> Back to menu", 1, PROFILE["text_color"], PROFILE["bg_color"])
 
@@ -46,63 +71,45 @@ def main(profile="default"):
     board[randrange(4)][randrange(4)] = choice([2, 4])
 
     # varible to know the state of the game
-    game_state = "normal"    
-
-    # main loop
-    while True:
-
-        if game_over(board):          
-            if pop_up(screen, fpsClock, msg="Play again? (y/n)"):
-
-                # reset game
-                board = [[0]*4 for i in range(4)] # reset board
-                SCORE = 0 # reset score
-                board[randrange(4)][randrange(4)] = choice([2, 4]) # set 1st random tile 
-                screen.fill(PROFILE["bg_color"]) # fill with background color
-
-            else:
-                terminate()
-
-        elif game_won(board) and game_state != "won+":
-            game_state = "won"
-            if pop_up(screen, fpsClock, msg="You winner! Continue? (y/n)"):
-                game_state = "won+"
+    game_state = "normal"
 
-            else:
+    # moves waiting to be applied to the board, as (direction, time of key press) pairs
+    move_queue = deque()
 
-                # reset game
-                board = [[0]*4 for i in range(4)] # reset board
-                SCORE = 0 # reset score
-                board[randrange(4)][randrange(4)] = choice([2, 4]) # set 1st random tile 
-                screen.fill(PROFILE["bg_color"]) # fill with background color
+    # events that woke up the loop while it was waiting for the next frame,
+    # and when that wait ended. Any other event arrived after that time,
+    # so it is used as the time the keys were pressed
+    pending, waited = [], perf_counter()
 
-        # update best score if needed
-        if SCORE > PROFILE["best_score"]: PROFILE["best_score"] = SCORE
+    # main loop
+    while True:
 
         # event loop
-        for event in pygame.event.get():
+        for event in pending + pygame.event.get():
             if event.type == QUIT: terminate()
 
-            # when a key is unpressed move the board
-            elif event.type == KEYUP:
-                if event.key == K_UP:
-                    board = move(board, "UP")
-
-                elif event.key == K_DOWN:
-                    board = move(board, "DOWN")
-
-                elif event.key == K_LEFT:
-                    board = move(board, "LEFT")
-
-                elif event.key == K_RIGHT:
-                    board = move(board, "RIGHT")
+            # when a key is pressed queue the move
+            elif event.type == KEYDOWN:
+                queue_move(move_queue, event, waited)
 
             # when the mouse is clicked
             elif event.type == MOUSEBUTTONUP:
                 # if button was clicked
                 if back_button.get_rect(bottomleft=screen.get_rect().bottomleft).collidepoint(pygame.mouse.get_pos()):
                     terminate(load=True)
-        
+
+        # apply every queued move before drawing, stopping if one of them ends the game
+        pressed_times = []
+        while move_queue:
+            direction, pressed = move_queue.popleft()
+            board = move(board, direction)
+            pressed_times.append(pressed)
+
+            if game_over(board) or (game_won(board) and game_state != "won+"): break
+
+        # update best score if needed
+        if SCORE > PROFILE["best_score"]: PROFILE["best_score"] = SCORE
+
         screen.fill(PROFILE["bg_color"]) # background color
 
         # blit the board surface to the center of the screen
@@ -123,9 +130,85 @@ def main(profile="default"):
         # blit back button surface
         screen.blit(back_button, back_button.get_rect(bottomleft=(screen.get_rect().bottomleft)))
         
-        # update screen and game clock
+        # update screen and record how long each move took to show up
         pygame.display.flip()
-        fpsClock.tick(60) # FPS = 60
+        displayed = perf_counter()
+        LATENCY.extend(displayed - pressed for pressed in pressed_times)
+
+        # the game can only end when the board changes, so only check after moves
+        if pressed_times and game_over(board):
+            if pop_up(screen, fpsClock, move_queue, msg="Play again? (y/n)"):
+
+                # reset game
+                board = [[0]*4 for i in range(4)] # reset board
+                SCORE = 0 # reset score
+                board[randrange(4)][randrange(4)] = choice([2, 4]) # set 1st random tile 
+                move_queue.clear() # forget moves meant for the old board
+                screen.fill(PROFILE["bg_color"]) # fill with background color
+
+            else:
+                terminate()
+
+        elif pressed_times and game_won(board) and game_state != "won+":
+            game_state = "won"
+            if pop_up(screen, fpsClock, move_queue, msg="You winner! Continue? (y/n)"):
+                game_state = "won+"
+
+            else:
+
+                # reset game
+                board = [[0]*4 for i in range(4)] # reset board
+                SCORE = 0 # reset score
+                board[randrange(4)][randrange(4)] = choice([2, 4]) # set 1st random tile 
+                move_queue.clear() # forget moves meant for the old board
+                screen.fill(PROFILE["bg_color"]) # fill with background color
+
+        # wait for the next frame (FPS = 60), but wake up as soon as there is input
+        pending, waited = wait_for_input(fpsClock)
+
+def queue_move(move_queue, event, pressed):
+    """Adds the move for the pressed arrow key to the end of 'move_queue',
+    together with the time it was pressed. Other keys are ignored and
+    new moves are dropped while the queue is full"""
+
+    if event.key in MOVE_KEYS and len(move_queue) < MAX_QUEUED_MOVES:
+        move_queue.append((MOVE_KEYS[event.key], pressed))
+
+def wait_for_input(fpsClock, fps=60):
+    """Sleeps until the next frame is due or one of the WAKE_EVENTS arrives,
+    whichever comes first. Other events that arrive meanwhile are discarded.
+    Returns a (events, time) tuple, with a list with the event that woke it up
+    (empty if none did) and the perf_counter() time of when the wait ended"""
+
+    deadline = pygame.time.get_ticks() + 1000 // fps - fpsClock.tick()
+
+    pending = []
+    while not pending:
+        time_left = deadline - pygame.time.get_ticks()
+        if time_left <= 0: break # a timeout of 0 would wait forever
+
+        event = pygame.event.wait(time_left)
+        if event.type in WAKE_EVENTS: pending.append(event)
+
+    woke = perf_counter()
+
+    # start counting the next frame from here
+    fpsClock.tick()
+
+    return pending, woke
+
+def latency_report():
+    """Returns a string describing the input-to-display latency of the most recent moves"""
+
+    if not LATENCY:
+        return "No moves were made"
+
+    frame = 1000 / 60
+    worst = max(LATENCY) * 1000
+    average = sum(LATENCY) / len(LATENCY) * 1000
+
+    return "Input latency over the last {} moves: average {:.1f}ms, worst {:.1f}ms (frame: {:.1f}ms)".format(
+        len(LATENCY), average, worst, frame)
 
 def terminate(save=True, load=False):
     """Saves data to profile
@@ -133,6 +216,8 @@ def terminate(save=True, load=False):
 
     # save data
     if save: save_profile(PROFILE, PROFILE["user"])
+
+    if REPORT_LATENCY: print(latency_report())
          
     # close program
     pygame.quit()
@@ -143,33 +228,11 @@ def terminate(save=True, load=False):
         
     sys.exit()
 
-def game_won(board, limit=2048):
-    """Checks if the limit (defaults to 2048) was reached"""
-
-    for row in board:
-        for tile in row:
-            if tile == limit: return True
-
-    return False
-
-def game_over(board):
-    """Checks if there are no more possible moves and if the board is full"""
-
-    # if there is at least one 0 on the board, then it's not game over
-    for row in board:
-        for num in row:
-            if num == 0: return False
-
-    # check if calling move(board, ...) makes a diference
-    for direction in ["UP", "DOWN", "LEFT", "DOWN"]:
-        if board != move(board, direction, count=False): return False
-
-    # if both tests above do not return False, then it's game over
-    return True
-
-def pop_up(screen, fpsClock, msg="(y/n)"):
+def pop_up(screen, fpsClock, move_queue, msg="(y/n)"):
     """Display a pop up message at the center of the screen with the string 'msg'.
-    Returns True if user presses the 'y' key and False if the 'n' key is pressed"""
+    Returns True if user presses the 'y' key and False if the 'n' key is pressed.
+    Arrow keys pressed meanwhile are kept on 'move_queue' instead of being lost,
+    timed from when the pop up closes so the wait does not count as input latency"""
 
     text_surf = pygame.font.SysFont("monospace", 30).render(msg, 1, PROFILE["text_color"], PROFILE["bg_color"])
 
@@ -179,12 +242,17 @@ def pop_up(screen, fpsClock, msg="(y/n)"):
         for event in pygame.event.get():
             if event.type == QUIT: terminate()
 
-            elif event.type == KEYUP:
-                if event.key == K_y:
-                    return True
+            elif event.type == KEYDOWN:
+                if event.key in (K_y, K_n):
+
+                    # moves made while the pop up was open only start counting now
+                    now = perf_counter()
+                    for i, (direction, _) in enumerate(move_queue):
+                        move_queue[i] = (direction, now)
+
+                    return event.key == K_y
 
-                elif event.key == K_n:
-                    return False
+                queue_move(move_queue, event, perf_counter())
 
         screen.blit(text_surf, text_surf.get_rect(center=screen.get_rect().center))
 
@@ -196,18 +264,10 @@ def move(board, direction, count=True):
     """Returns a new version of the board after collapsing all the rows
     and collumns in the right fashion, according to the direction argument.
     score is incremented with the formed numbers"""
-    
-    if direction == "UP":
-        new_board = transpose([list(reversed(collapsed(list(reversed(row)), count))) for row in transpose(board)])
-
-    elif direction == "DOWN":
-        new_board = transpose([collapsed(row, count) for row in transpose(board)])
-
-    elif direction == "LEFT":
-        new_board = [list(reversed(collapsed(list(reversed(row)), count))) for row in board]
+    global SCORE
 
-    elif direction == "RIGHT":
-        new_board = [collapsed(row, count) for row in board]
+    new_board, score = slide(board, direction)
+    if count: SCORE += score
 
     if board != new_board:
         insert_random(new_board)
@@ -224,63 +284,6 @@ def insert_random(board):
         x, y = choice(empty_tiles)
         board[y][x] = choice([2, 4])
 
-def transpose(board):
-    """Return the transposed version of the board matrix
-    Transposition is done just like in normal algebra"""
-    
-    trans = [[0]*4 for _ in range(len(board))]
-    for i, j in product(list(range(4)), repeat=2):
-        trans[j][i] = board[i][j]
-
-    return trans
-    
-def collapsed(lst, count=True):
-    """Returns the row list in 'collapsed' form
-    This always collapses to the right, so change the entry accordingly
-    e.g. collapsed([4, 0, 2, 2]) -> [0, 0, 4, 4]"""
-    global SCORE
-
-    row = [x for x in lst] # copy lst to row
-
-    # 'push' the numbers to the right
-    row = push_to_right(row)
-    
-    if row[2] == row[3]:
-        row[2], row[3] = 0, row[2] + row[3] # add the two together and place on row[3]
-        if count: SCORE += row[3]
-
-        if row[0] == row[1]:
-            row[0], row[1] = 0, row[0] + row[1] # add the two together and place on row[1]
-            if count: SCORE += row[1]
-
-    elif row[1] == row[2]:
-        row[1], row[2] = 0, row[1] + row[2] # add the two together and place on row[2]
-        if count: SCORE += row[2]
-
-    elif row[0] == row[1]:
-        row[0], row[1] = 0, row[0] + row[1] # add the two together and place on row[1]
-        if count: SCORE += row[1]
-
-    # 'push' again
-    row = push_to_right(row)
-
-    return row
-
-def push_to_right(lst):
-    """Helper function for collapsed function.
-    Pushes all entries of row the farthest to the right as possible
-    Returns a new row list
-    e.g. push_to_right([4, 0, 2, 0]) -> [0, 0, 4, 2]"""
-    
-    row = [x for x in lst]
-    
-    for _ in range(len(row) - 1):
-        for i in range(len(row) - 1):
-            if row[i + 1] == 0:
-                row[i], row[i + 1] = row[i + 1], row[i]
-
-    return row
-
 def get_user_surf(msg="Hi there {}"):
     """Returns the text surface for blitting using the provided message"""
 
@@ -314,4 +317,4 @@ def get_board_surf(board, img_dict):
     return board_surf
     
 if __name__ == "__main__":
-    main()
+    main(report_latency="--latency" in sys.argv)
@@ -0,0 +1,253 @@
+"""Command line tool to analyse a stream of boards with the rules from rules.py,
+without needing pygame. For each board a line is written with:
+    - the legal moves
+    - the resulting board and score gained for each direction
+    - if the game is won or over
+    - the number of empty tiles
+
+Boards are read one per line, as 16 numbers separated by spaces or commas
+in row order starting at the top left tile, or with --binary as packed
+64 bit big-endian integers where each 4 bit nibble is the exponent of a tile
+(0 for an empty tile), the top left tile being the most significant nibble.
+
+Input is analysed in chunks by a pool of worker processes, and results
+are written in the same order the boards were read. Only a few chunks
+are held in memory at a time, so inputs can be as big as needed.
+
+e.g. python analyze.py boards.txt -o results.txt
+     python analyze.py --binary < boards.bin
+     python analyze.py --check (checks the rules and the board readers)"""
+
+import os
+import sys
+import json
+import argparse
+from collections import deque
+from itertools import islice
+from multiprocessing import Pool, cpu_count
+
+import rules
+from rules import DIRECTIONS, slide, game_won, empty_count
+from cache import SHARED_CACHE, entries_for
+
+def analyze_board(board, cache=None):
+    """Returns a dictionary with the analysis of the board.
+    If a BoardCache is given, game over checks of full boards are looked up on it"""
+
+    moves = {}
+    for direction in DIRECTIONS:
+        new_board, score = slide(board, direction)
+        moves[direction] = {"board": new_board, "score": score}
+
+    legal = [d for d in DIRECTIONS if moves[d]["board"] != board]
+    empty = empty_count(board)
+
+    # same as game_over(board), without sliding the board again
+    over = not legal and empty == 0
+    if cache and empty == 0:
+        over = cache.game_over(board)
+
+    return {"board": board,
+            "legal": legal,
+            "moves": moves,
+            "won": game_won(board),
+            "over": over,
+            "empty": empty}
+
+def parse_line(line):
+    """Returns the board represented by a line of text with 16 numbers"""
+
+    tiles = [int(tile) for tile in line.replace(",", " ").split()]
+    if len(tiles) != 16:
+        raise ValueError("expected 16 tiles, got {}".format(len(tiles)))
+
+    for tile in tiles:
+        # tiles are either empty (0) or a power of two
+        if tile != 0 and (tile < 2 or tile & (tile - 1)):
+            raise ValueError("{} is not a valid tile".format(tile))
+
+    return [tiles[i:i + 4] for i in range(0, 16, 4)]
+
+def unpack_board(packed):
+    """Returns the board represented by a 64 bit integer of tile exponents"""
+
+    exponents = [(packed >> (60 - 4*i)) & 0xF for i in range(16)]
+    tiles = [2**e if e else 0 for e in exponents]
+
+    return [tiles[i:i + 4] for i in range(0, 16, 4)]
+
+def check(boards=30000):
+    """Checks the rules with rules.check(), and that parse_line() and unpack_board()
+    give the same board for the same random boards written as text and packed.
+    Raises an AssertionError if something is wrong"""
+
+    from random import randrange
+
+    rules.check(boards)
+
+    for _ in range(boards):
+        exponents = [randrange(16) for _ in range(16)]
+        packed = sum(e << (60 - 4*i) for i, e in enumerate(exponents))
+        line = " ".join(str(2**e if e else 0) for e in exponents)
+
+        assert parse_line(line) == unpack_board(packed), "boards differ for {}".format(line)
+
+    # tiles that are not 0 or a power of two must be rejected
+    for tile in (1, 3, 6, -2):
+        try:
+            parse_line(" ".join([str(tile)] + ["0"]*15))
+        except ValueError:
+            continue
+        raise AssertionError("{} was accepted as a tile".format(tile))
+
+def analyze_chunk(chunk):
+    """Analyses a (number of first board, raw data, binary, cache megabytes) chunk.
+    Returns a (text, hits, misses) tuple, where text has one line of results per board
+    and hits and misses are how many the cache had while analysing this chunk.
+    This is what is run on the worker processes, each using its own SHARED_CACHE"""
+
+    start, data, binary, cache_mb = chunk
+    cache = None
+
+    if cache_mb:
+        cache = SHARED_CACHE
+        cache.max_size = entries_for(cache_mb * 2**20)
+    hits, misses = SHARED_CACHE.hits, SHARED_CACHE.misses
+
+    if binary:
+        boards = [unpack_board(int.from_bytes(data[i:i + 8], "big")) for i in range(0, len(data), 8)]
+
+    else:
+        boards = []
+        for n, line in enumerate(data, start):
+            try:
+                boards.append(parse_line(line))
+            except ValueError as e:
+                raise ValueError("board {}: {}".format(n, e))
+
+    text = "".join(json.dumps(analyze_board(board, cache), separators=(",", ":")) + "\n" for board in boards)
+
+    return text, SHARED_CACHE.hits - hits, SHARED_CACHE.misses - misses
+
+def read_chunks(stream, chunk_size, binary=False, cache_mb=0):
+    """Yields (number of first board, raw data, binary, cache megabytes) chunks with up to
+    'chunk_size' boards, to be passed to analyze_chunk. Blank lines are skipped"""
+
+    start = 1
+
+    if binary:
+        while True:
+            data = stream.read(8*chunk_size)
+            if not data: return
+
+            if len(data) % 8:
+                raise ValueError("input size is not a multiple of 8 bytes")
+
+            yield start, data, binary, cache_mb
+            start += len(data) // 8
+
+    else:
+        lines = (line for line in stream if line.strip())
+        while True:
+            data = list(islice(lines, chunk_size))
+            if not data: return
+
+            yield start, data, binary, cache_mb
+            start += len(data)
+
+def run(chunks, output, workers):
+    """Analyses all the chunks and writes the results to 'output' in order.
+    At most two chunks per worker are in flight at once.
+    Returns a (hits, misses) tuple with the totals of the caches of all the workers"""
+
+    totals = [0, 0]
+
+    def write(result):
+        text, hits, misses = result
+        output.write(text)
+        totals[0] += hits
+        totals[1] += misses
+
+    if workers == 1:
+        for chunk in chunks:
+            write(analyze_chunk(chunk))
+        return tuple(totals)
+
+    with Pool(workers) as pool:
+        in_flight = deque()
+
+        for chunk in chunks:
+            in_flight.append(pool.apply_async(analyze_chunk, (chunk,)))
+
+            # wait for the oldest chunk before reading more
+            if len(in_flight) >= 2*workers:
+                write(in_flight.popleft().get())
+
+        while in_flight:
+            write(in_flight.popleft().get())
+
+    return tuple(totals)
+
+def main(argv=None):
+    """Parses the command line arguments and runs the analysis"""
+
+    parser = argparse.ArgumentParser(description="Analyse a stream of 2048 boards")
+    parser.add_argument("input", nargs="?", default="-", help="file with the boards (default: stdin)")
+    parser.add_argument("-o", "--output", default="-", help="file to write the results to (default: stdout)")
+    parser.add_argument("--binary", action="store_true", help="read boards packed as 64 bit integers")
+    parser.add_argument("--workers", type=int, default=cpu_count(), help="number of worker processes")
+    parser.add_argument("--cache", type=float, nargs="?", const=40, default=0, metavar="MB",
+                        help="look up the game over checks of full boards on a cache shared by boards that are "
+                             "rotations or reflections of each other, using up to MB megabytes per worker (default: 40), "
+                             "and print its hit rate. Slides are always recomputed, as that is faster than looking them "
+                             "up. The cache only pays off for results that cost more than finding a board's canonical "
+                             "key, which is never the case here even with many repeated or symmetric boards, so this "
+                             "makes the analysis slower and is meant to measure how much the input repeats")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="number of boards per chunk")
+    parser.add_argument("--check", action="store_true", help="check the rules and the board readers, then exit")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        check()
+        parser.exit(0, "All checks passed\n")
+
+    if args.workers < 1 or args.chunk_size < 1:
+        parser.error("--workers and --chunk-size must be at least 1")
+
+    if args.cache < 0:
+        parser.error("--cache must not be negative")
+
+    try:
+        if args.input == "-":
+            stream = sys.stdin.buffer if args.binary else sys.stdin
+        else:
+            stream = open(args.input, "rb" if args.binary else "r")
+
+        output = sys.stdout if args.output == "-" else open(args.output, "w")
+
+    except OSError as e:
+        parser.error(e)
+
+    try:
+        hits, misses = run(read_chunks(stream, args.chunk_size, args.binary, args.cache), output, args.workers)
+
+        if args.cache:
+            lookups = hits + misses
+            sys.stderr.write("cache: {} hits, {} misses (hit rate {:.1%})\n".format(
+                hits, misses, hits / lookups if lookups else 0.0))
+
+    except ValueError as e:
+        parser.exit(1, "error: {}\n".format(e))
+
+    except BrokenPipeError:
+        # the reader went away (e.g. piped into 'head'), so stop quietly.
+        # stdout is pointed at devnull so python does not complain when flushing it on exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
+
+    finally:
+        if stream not in (sys.stdin, sys.stdin.buffer): stream.close()
+        if output is not sys.stdout: output.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""This module contains a cache for results computed from boards, like the ones from
+game_over() in rules.py or from evaluation functions used by search and analysis code.
+Results are stored under the canonical key of the board, so all 8 rotations and
+reflections of a board share the same entry.
+
+slide() is not cached: with the rows looked up on ROW_TABLE it takes less time
+than finding the canonical key of the board, so a cache could only make it slower"""
+
+from collections import OrderedDict
+
+from rules import game_over, canonical, unflatten
+
+# returned by BoardCache.lookup when there is no result for a key
+MISSING = object()
+
+# roughly how many bytes an entry takes: the ordered dict slot, the (name, key) tuple,
+# the 16 tile tuple of the key and the tiles above 256 it keeps alive, and a small result.
+# Measured at about 300 bytes with small tiles and 400 with tiles up to 2048
+ENTRY_BYTES = 400
+
+def entries_for(max_bytes):
+    """Returns how many entries fit in max_bytes, to use as the max_size of a BoardCache"""
+
+    return max(1, int(max_bytes // ENTRY_BYTES))
+
+class BoardCache:
+    """Bounded cache that forgets the least recently used results once
+    it holds 'max_size' of them, and counts its hits and misses.
+    If max_bytes is given, max_size is worked out from it with entries_for()"""
+
+    def __init__(self, max_size=100000, max_bytes=None):
+
+        self.max_size = entries_for(max_bytes) if max_bytes is not None else max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key):
+        """Returns the result stored under key, or MISSING if there is none"""
+
+        result = self.entries.get(key, MISSING)
+
+        if result is MISSING:
+            self.misses += 1
+
+        else:
+            self.entries.move_to_end(key)
+            self.hits += 1
+
+        return result
+
+    def store(self, key, result):
+        """Stores the result under key, forgetting the oldest result if the cache is full"""
+
+        self.entries[key] = result
+
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def get(self, key, compute):
+        """Returns the result stored under key, calling compute() to get it if it is missing"""
+
+        result = self.lookup(key)
+
+        if result is MISSING:
+            result = compute()
+            self.store(key, result)
+
+        return result
+
+    def game_over(self, board, canon=None):
+        """Same as game_over(board) from rules.py, using the cache.
+        canon is the (key, symmetry) tuple from canonical(board), if it is already known,
+        so that looking up several results for the same board only finds it once"""
+
+        key, _ = canon or canonical(board)
+
+        return self.get(("over", key), lambda: game_over(unflatten(key)))
+
+    def evaluate(self, board, function, canon=None):
+        """Returns function(board), using the cache.
+        The function must give the same result for all rotations and reflections of a board.
+        canon is the same as in game_over"""
+
+        key, _ = canon or canonical(board)
+
+        return self.get((function, key), lambda: function(unflatten(key)))
+
+    def hit_rate(self):
+        """Returns the fraction of lookups that were found on the cache"""
+
+        lookups = self.hits + self.misses
+
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        """Returns a dictionary with the size and the hit counters of the cache"""
+
+        return {"size": len(self.entries),
+                "max_size": self.max_size,
+                "approx_bytes": len(self.entries) * ENTRY_BYTES,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hit_rate()}
+
+    def clear(self):
+        """Forgets all the results and resets the counters"""
+
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+# cache meant to be shared by everything running on the same process (about 40MB when full)
+SHARED_CACHE = BoardCache()
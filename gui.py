@@ -112,13 +112,14 @@ class CreateMenu:
         self.save_button = tkinter.Button(self.root, text="SAVE", command=self.save)
         self.preview_button = tkinter.Button(self.root, text="PREVIEW", command=self.show_preview)
 
-        self.fields = ["user", "tile_set_name", "board_color", "bg_color", "text_color", "score_msg"]
+        self.fields = ["user", "tile_set_name", "board_color", "bg_color", "text_color", "score_msg", "key_repeat"]
         self.label_text = ["User name",
                            "Tile Set",
                            "Board Color (RGB)",
                            "Background color (RGB)",
                            "Text Color (RGB)",
-                           "Score text"]
+                           "Score text",
+                           "Key repeat (True/False)"]
         
         self.default_profile = load_profile(profile_name=load) # function from tools module
 
@@ -147,7 +148,8 @@ class CreateMenu:
                 "board_color": eval(self.widgets[2]["entry"].get()),
                 "bg_color": eval(self.widgets[3]["entry"].get()),
                 "text_color": eval(self.widgets[4]["entry"].get()),
-                "score_msg": self.widgets[5]["entry"].get()}
+                "score_msg": self.widgets[5]["entry"].get(),
+                "key_repeat": eval(self.widgets[6]["entry"].get())}
 
     def save(self):
         """Saves profile, exits app and start load menu again"""
@@ -176,8 +178,8 @@ class CreateMenu:
             widget["entry"].grid(row=i, column=1)
 
         # put the save and preview buttons on the bottom
-        self.save_button.grid(row=6, column=0)
-        self.preview_button.grid(row=6, column=1)
+        self.save_button.grid(row=7, column=0)
+        self.preview_button.grid(row=7, column=1)
 
     def run(self):
         """Starts menu application"""
@@ -0,0 +1,298 @@
+"""This module contains the rules of the game, without any pygame code,
+so they can be used both by the main script at 2048.py and by
+command line tools like analyze.py"""
+
+from itertools import product
+from operator import itemgetter
+
+DIRECTIONS = ["UP", "DOWN", "LEFT", "RIGHT"]
+
+# (row, collumn) step of each direction
+VECTORS = {"UP": (-1, 0), "DOWN": (1, 0), "LEFT": (0, -1), "RIGHT": (0, 1)}
+
+# the 8 rotations and reflections of the board, as functions
+# taking the (row, collumn) of a tile to its new position
+SYMMETRIES = [lambda r, c: (r, c),         # identity
+              lambda r, c: (c, 3 - r),     # rotate 90 degrees clockwise
+              lambda r, c: (3 - r, 3 - c), # rotate 180 degrees
+              lambda r, c: (3 - c, r),     # rotate 90 degrees anticlockwise
+              lambda r, c: (r, 3 - c),     # mirror left to right
+              lambda r, c: (3 - r, c),     # mirror top to bottom
+              lambda r, c: (c, r),         # transpose
+              lambda r, c: (3 - c, 3 - r)] # transpose on the other diagonal
+
+def slide(board, direction):
+    """Returns a (new_board, score) tuple, where new_board is the board after collapsing
+    all the rows and collumns in the right fashion, according to the direction argument,
+    and score is the sum of the formed numbers. No random tile is added"""
+
+    if direction == "UP":
+        rows = [collapse_row(col[::-1]) for col in zip(*board)]
+        new_board = [list(row) for row in zip(*(row[::-1] for row, _ in rows))]
+
+    elif direction == "DOWN":
+        rows = [collapse_row(col) for col in zip(*board)]
+        new_board = [list(row) for row in zip(*(row for row, _ in rows))]
+
+    elif direction == "LEFT":
+        rows = [collapse_row(tuple(row[::-1])) for row in board]
+        new_board = [list(row[::-1]) for row, _ in rows]
+
+    elif direction == "RIGHT":
+        rows = [collapse_row(tuple(row)) for row in board]
+        new_board = [list(row) for row, _ in rows]
+
+    return new_board, rows[0][1] + rows[1][1] + rows[2][1] + rows[3][1]
+
+def slow_slide(board, direction):
+    """Same as slide, but collapsing every row with collapsed() instead of using ROW_TABLE.
+    This is how the game always did it, and is kept to check slide against"""
+
+    if direction == "UP":
+        rows = [collapsed(list(reversed(row))) for row in transpose(board)]
+        new_board = transpose([list(reversed(row)) for row, _ in rows])
+
+    elif direction == "DOWN":
+        rows = [collapsed(row) for row in transpose(board)]
+        new_board = transpose([row for row, _ in rows])
+
+    elif direction == "LEFT":
+        rows = [collapsed(list(reversed(row))) for row in board]
+        new_board = [list(reversed(row)) for row, _ in rows]
+
+    elif direction == "RIGHT":
+        rows = [collapsed(row) for row in board]
+        new_board = [row for row, _ in rows]
+
+    return new_board, sum(score for _, score in rows)
+
+def game_won(board, limit=2048):
+    """Checks if the limit (defaults to 2048) was reached"""
+
+    for row in board:
+        for tile in row:
+            if tile == limit: return True
+
+    return False
+
+def game_over(board):
+    """Checks if there are no more possible moves and if the board is full"""
+
+    # if there is at least one 0 on the board, then it's not game over
+    for row in board:
+        for num in row:
+            if num == 0: return False
+
+    # check if sliding the board makes a diference
+    for direction in DIRECTIONS:
+        if board != slide(board, direction)[0]: return False
+
+    # if both tests above do not return False, then it's game over
+    return True
+
+def empty_count(board):
+    """Returns the number of empty (0) tiles on the board"""
+
+    return sum(row.count(0) for row in board)
+
+def transpose(board):
+    """Return the transposed version of the board matrix
+    Transposition is done just like in normal algebra"""
+    
+    trans = [[0]*4 for _ in range(len(board))]
+    for i, j in product(list(range(4)), repeat=2):
+        trans[j][i] = board[i][j]
+
+    return trans
+    
+def collapsed(lst):
+    """Returns a (row, score) tuple with the row list in 'collapsed' form
+    and the sum of the numbers formed while collapsing it.
+    This always collapses to the right, so change the entry accordingly
+    e.g. collapsed([4, 0, 2, 2]) -> ([0, 0, 4, 4], 4)"""
+
+    row = [x for x in lst] # copy lst to row
+    score = 0
+
+    # 'push' the numbers to the right
+    row = push_to_right(row)
+    
+    if row[2] == row[3]:
+        row[2], row[3] = 0, row[2] + row[3] # add the two together and place on row[3]
+        score += row[3]
+
+        if row[0] == row[1]:
+            row[0], row[1] = 0, row[0] + row[1] # add the two together and place on row[1]
+            score += row[1]
+
+    elif row[1] == row[2]:
+        row[1], row[2] = 0, row[1] + row[2] # add the two together and place on row[2]
+        score += row[2]
+
+    elif row[0] == row[1]:
+        row[0], row[1] = 0, row[0] + row[1] # add the two together and place on row[1]
+        score += row[1]
+
+    # 'push' again
+    row = push_to_right(row)
+
+    return row, score
+
+def push_to_right(lst):
+    """Helper function for collapsed function.
+    Pushes all entries of row the farthest to the right as possible
+    Returns a new row list
+    e.g. push_to_right([4, 0, 2, 0]) -> [0, 0, 4, 2]"""
+    
+    row = [x for x in lst]
+    
+    for _ in range(len(row) - 1):
+        for i in range(len(row) - 1):
+            if row[i + 1] == 0:
+                row[i], row[i + 1] = row[i + 1], row[i]
+
+    return row
+
+def _symmetry_tables():
+    """Helper function to build the lookup tables used by the symmetry functions.
+    Returns a list with a (getter, inverse getter, direction map) tuple for each symmetry,
+    where the getters pick the tiles of a flattened board in their new order"""
+
+    tables = []
+    for symmetry in SYMMETRIES:
+
+        # order[new] is the position on the original board of the tile that goes to 'new'
+        order = [0]*16
+        for r, c in product(list(range(4)), repeat=2):
+            new_r, new_c = symmetry(r, c)
+            order[4*new_r + new_c] = 4*r + c
+
+        inverse = [0]*16
+        for new, old in enumerate(order):
+            inverse[old] = new
+
+        # see where a step from the middle of the board ends up to know how directions change
+        directions = {}
+        for direction, (dr, dc) in VECTORS.items():
+            start, end = symmetry(1, 1), symmetry(1 + dr, 1 + dc)
+            step = (end[0] - start[0], end[1] - start[1])
+            directions[direction] = [d for d, v in VECTORS.items() if v == step][0]
+
+        tables.append((itemgetter(*order), itemgetter(*inverse), directions))
+
+    return tables
+
+SYMMETRY_TABLES = _symmetry_tables()
+
+def flatten(board):
+    """Returns the board as a tuple of 16 tiles, in row order"""
+
+    return tuple(board[0] + board[1] + board[2] + board[3])
+
+def unflatten(tiles):
+    """Returns the board represented by a tuple of 16 tiles, in row order"""
+
+    return [list(tiles[i:i + 4]) for i in range(0, 16, 4)]
+
+def canonical(board):
+    """Returns a (key, symmetry) tuple, where key is the same flattened board for all
+    rotations and reflections of this board, and symmetry is the index in SYMMETRIES
+    of the one that turns the board into the key"""
+
+    tiles = flatten(board)
+
+    return min((getter(tiles), i) for i, (getter, _, _) in enumerate(SYMMETRY_TABLES))
+
+def apply_symmetry(board, symmetry):
+    """Returns a new board with the symmetry (index in SYMMETRIES) applied"""
+
+    return unflatten(SYMMETRY_TABLES[symmetry][0](flatten(board)))
+
+def undo_symmetry(board, symmetry):
+    """Returns a new board with the symmetry (index in SYMMETRIES) undone,
+    e.g. undo_symmetry(apply_symmetry(board, s), s) == board"""
+
+    return unflatten(SYMMETRY_TABLES[symmetry][1](flatten(board)))
+
+def to_canonical_direction(direction, symmetry):
+    """Returns the direction that 'direction' becomes when the symmetry is applied"""
+
+    return SYMMETRY_TABLES[symmetry][2][direction]
+
+def from_canonical_direction(direction, symmetry):
+    """Returns the direction that 'direction' becomes when the symmetry is undone"""
+
+    for original, new in SYMMETRY_TABLES[symmetry][2].items():
+        if new == direction: return original
+
+def _collapse_exponents(row):
+    """Helper function to build ROW_TABLE. Returns a (row, score) tuple like collapsed,
+    but for a row of tile exponents (0 for an empty tile) instead of tiles"""
+
+    # take the tiles from the right, merging each one with the next if they are equal
+    tiles = [e for e in reversed(row) if e]
+    new_row, score = [], 0
+
+    while tiles:
+        e = tiles.pop(0)
+        if tiles and tiles[0] == e:
+            tiles.pop(0)
+            new_row.append(e + 1)
+            score += 2**(e + 1)
+
+        else:
+            new_row.append(e)
+
+    return [0]*(4 - len(new_row)) + list(reversed(new_row)), score
+
+def _row_table():
+    """Helper function to build ROW_TABLE"""
+
+    tiles = [0] + [2**e for e in range(1, 17)] # the same int objects are shared by all rows
+
+    table = {}
+    for row in product(list(range(16)), repeat=4):
+        new_row, score = _collapse_exponents(row)
+        table[tuple(tiles[e] for e in row)] = (tuple(tiles[e] for e in new_row), score)
+
+    return table
+
+# result of collapsed() for every row with tiles up to 32768, as a tuple, to slide boards
+# without collapsing each row again. Checked against collapsed() by check()
+ROW_TABLE = _row_table()
+
+def collapse_row(row):
+    """Same as collapsed(row) for a tuple, but returns the row as a tuple and
+    looks it up on ROW_TABLE when possible"""
+
+    result = ROW_TABLE.get(row)
+    if result is None:
+        new_row, score = collapsed(row)
+        result = (tuple(new_row), score)
+
+    return result
+
+def check(boards=30000):
+    """Checks that ROW_TABLE has the same result as collapsed() for every row, and that
+    slide() gives the same boards and scores as slow_slide() for random boards.
+    Raises an AssertionError if something is wrong"""
+
+    from random import choice, randrange
+
+    for row, result in ROW_TABLE.items():
+        new_row, score = collapsed(row)
+        assert result == (tuple(new_row), score), "ROW_TABLE is wrong for {}".format(row)
+
+    # mostly small tiles so that there are merges, and some bigger than ROW_TABLE covers
+    tiles = [0, 0, 0, 2, 2, 4, 4, 8, 16, 32, 2048, 32768, 65536]
+
+    for _ in range(boards):
+        board = [[choice(tiles[:randrange(4, len(tiles) + 1)]) for _ in range(4)] for _ in range(4)]
+        for direction in DIRECTIONS:
+            assert slide(board, direction) == slow_slide(board, direction), \
+                "slide is wrong for {} {}".format(board, direction)
+
+if __name__ == "__main__":
+    # if module is run on it's own, check the rules
+    check()
+    print("All checks passed")
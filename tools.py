@@ -63,6 +63,7 @@ def ensure_default_profile():
                        "games_won": 0,
                        "games_played": 0,
                        "tile_set_name": "default",
+                       "key_repeat": False,
                        "score_msg": "Score: {}    Best: {}"}
 
     # if folder does not exists create new folder and file